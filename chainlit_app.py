@@ -1,6 +1,19 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
 import chainlit as cl
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+from tracing import span
+
+# Response cache configuration
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
 
 app = FastAPI()
 
@@ -12,16 +25,144 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class ResponseCache:
+    """LRU cache of finished answers; entries expire after `ttl` seconds."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+# key -> SharedComputation for answers currently being computed, so identical
+# concurrent requests read one backend run instead of starting their own
+inflight = {}
+
+def cache_key(message, context=None):
+    normalized = " ".join(message.casefold().split())
+    return normalized, json.dumps(context or {}, sort_keys=True)
+
 @app.post("/slack_message")
 async def receive_slack_message(request: Request):
-    data = await request.json()
+    with span("chainlit.slack_message", parent=request.headers.get("traceparent")):
+        with span("chainlit.parse_request"):
+            data = await request.json()
+        message = data['message']
+        response = await process_message(message, data.get('context'))
+        return response
+
+@app.post("/slack_message/stream")
+async def receive_slack_message_stream(request: Request):
+    # Chunked text/plain: each chunk is the next piece of the answer
+    traceparent = request.headers.get("traceparent")
+    with span("chainlit.parse_request", parent=traceparent):
+        data = await request.json()
     message = data['message']
-    response = await process_message(message)
-    return response
+    stream = traced_stream(cached_stream(message, data.get('context')), traceparent)
+    return StreamingResponse(stream, media_type="text/plain")
+
+async def traced_stream(tokens, traceparent):
+    # StreamingResponse iterates after the handler returns, so the request
+    # span has to live here rather than in the route
+    with span("chainlit.slack_message_stream", parent=traceparent):
+        async for token in tokens:
+            yield token
+
+async def stream_message(message):
+    # This is where you'd implement your Chainlit logic; yield tokens as
+    # the backend produces them so callers can show partial answers
+    for token in ["Processed: ", message]:
+        yield token
+
+async def cached_stream(message, context=None):
+    """Stream an answer, serving repeats from the cache and coalescing duplicates."""
+    with span("process_message") as attrs:
+        async for token in _cached_stream(message, context, attrs):
+            yield token
+
+async def _cached_stream(message, context, attrs):
+    key = cache_key(message, context)
+    cached = response_cache.get(key)
+    if cached is not None:
+        attrs["cache"] = "hit"
+        yield cached
+        return
+    computation = inflight.get(key)
+    if computation is not None:
+        attrs["cache"] = "coalesced"
+    else:
+        attrs["cache"] = "miss"
+        computation = inflight[key] = SharedComputation(key, message)
+    async for token in computation.consume():
+        yield token
+
+class SharedComputation:
+    """
+    Runs one backend stream in its own task so the requester and any
+    coalesced followers can all read it, and none of them disconnecting
+    cancels the work or fails it for the others.
+    """
+
+    def __init__(self, key, message):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run(key, message))
+
+    async def _run(self, key, message):
+        try:
+            async for token in stream_message(message):
+                self.tokens.append(token)
+                self._notify()
+            response_cache.put(key, "".join(self.tokens))
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Response computation was cancelled")
+            raise
+        except Exception as e:
+            # Handed to every consumer rather than re-raised into the task
+            self.error = e
+        finally:
+            self.done = True
+            inflight.pop(key, None)
+            self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def consume(self):
+        """Yields every token produced so far, then new ones as they arrive."""
+        position = 0
+        while True:
+            while position < len(self.tokens):
+                yield self.tokens[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
 
-async def process_message(message):
-    # This is where you'd implement your Chainlit logic
-    return f"Processed: {message}"
+async def process_message(message, context=None):
+    return "".join([token async for token in cached_stream(message, context)])
 
 @cl.on_chat_start
 async def start():
@@ -29,8 +170,10 @@ async def start():
 
 @cl.on_message
 async def main(message: cl.Message):
-    response = await process_message(message.content)
-    await cl.Message(content=response).send()
+    response = cl.Message(content="")
+    async for token in cached_stream(message.content):
+        await response.stream_token(token)
+    await response.send()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,47 +1,245 @@
 import os
 import asyncio
+import codecs
+import time
+from collections import OrderedDict
 from fastapi import FastAPI
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 import aiohttp
 import logging
+from slack_sdk.errors import SlackApiError
+
+from tracing import current_traceparent, inject_headers, span
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chainlit bridge configuration
+CHAINLIT_URL = os.getenv("CHAINLIT_URL", "http://localhost:8000/slack_message")
+CHAINLIT_STREAM_URL = os.getenv("CHAINLIT_STREAM_URL", CHAINLIT_URL + "/stream")
+CHAINLIT_MAX_INFLIGHT = int(os.getenv("CHAINLIT_MAX_INFLIGHT", "8"))  # concurrent forwards
+CHAINLIT_QUEUE_SIZE = int(os.getenv("CHAINLIT_QUEUE_SIZE", "100"))  # pending forwards before we shed load
+CHAINLIT_TIMEOUT = float(os.getenv("CHAINLIT_TIMEOUT", "60"))  # max idle time between streamed chunks
+DEDUP_TTL = float(os.getenv("SLACK_DEDUP_TTL", "600"))  # Slack retries within a few minutes
+DEDUP_MAX_ENTRIES = int(os.getenv("SLACK_DEDUP_MAX_ENTRIES", "10000"))
+SLACK_UPDATE_INTERVAL = float(os.getenv("SLACK_UPDATE_INTERVAL", "1.0"))  # per answer
+SLACK_UPDATES_PER_MINUTE = float(os.getenv("SLACK_UPDATES_PER_MINUTE", "45"))  # shared; chat.update is Tier 3 (~50/min)
+SLACK_FINAL_UPDATE_RETRIES = 3
+PLACEHOLDER_MESSAGE = ":hourglass_flowing_sand: Thinking..."
+OVERLOAD_MESSAGE = "I'm handling a lot of requests right now, please try again in a minute."
+
 # Initialize FastAPI
 app = FastAPI()
 
 # Initialize Slack app
 slack_app = AsyncApp(token=os.environ["SLACK_BOT_TOKEN"])
 
+# Shared state, owned by the FastAPI lifecycle (see startup_event/shutdown_event)
+chainlit_session = None
+forward_queue = None
+forward_workers = []
+
+class DedupCache:
+    """Remembers recently seen event keys for `ttl` seconds, capped at `max_entries`."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+
+    def _expire(self, now):
+        while self._seen:
+            key, expires = next(iter(self._seen.items()))
+            if expires > now and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def check_and_add(self, keys):
+        """Return True if any of `keys` was already seen; record all of them either way."""
+        now = time.monotonic()
+        self._expire(now)
+        duplicate = any(key in self._seen for key in keys)
+        for key in keys:
+            self._seen[key] = now + self.ttl
+            self._seen.move_to_end(key)
+        self._expire(now)
+        return duplicate
+
+seen_events = DedupCache(DEDUP_TTL, DEDUP_MAX_ENTRIES)
+
+class UpdateRateLimiter:
+    """Spaces chat.update calls evenly across every answer being streamed."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self.next_slot = 0.0
+
+    def try_acquire(self):
+        """Take a slot if one is free right now; progress updates just skip otherwise."""
+        now = time.monotonic()
+        if now < self.next_slot:
+            return False
+        self.next_slot = now + self.interval
+        return True
+
+    async def acquire(self):
+        """Reserve the next slot and wait for it; used for the final update."""
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+update_limiter = UpdateRateLimiter(SLACK_UPDATES_PER_MINUTE)
+
+def is_rate_limited(error):
+    return error.response is not None and error.response.status_code == 429
+
+def event_keys(body):
+    # A channel mention arrives as both app_mention and message with different
+    # event_ids, so the message identity (channel+ts / client_msg_id) is what
+    # catches those; event_id catches Slack's retries of the same delivery.
+    event = body["event"]
+    keys = []
+    if event.get("channel") and event.get("ts"):
+        keys.append(f"ts:{event['channel']}:{event['ts']}")
+    if event.get("client_msg_id"):
+        keys.append(f"msg:{event['client_msg_id']}")
+    if body.get("event_id"):
+        keys.append(f"event:{body['event_id']}")
+    return keys
+
+def is_duplicate(body):
+    keys = event_keys(body)
+    if keys and seen_events.check_and_add(keys):
+        logger.info(f"Skipping duplicate Slack event {keys[0]}")
+        return True
+    return False
+
 # Slack event handlers
 @slack_app.event("app_mention")
-async def handle_app_mention(body, say):
+async def handle_app_mention(body, say, ack):
+    # Ack first so Slack doesn't retry; the forward happens on a worker
+    await ack()
     logger.info("Received app mention in Slack")
-    event = body["event"]
-    response = await send_to_chainlit(event["text"])
-    await say(response)
+    with span("slack.event", event_type="app_mention"):
+        if is_duplicate(body):
+            return
+        event = body["event"]
+        await enqueue_forward(event["text"], say)
 
 @slack_app.event("message")
-async def handle_message(body, say):
+async def handle_message(body, say, ack):
+    await ack()
     logger.info("Received message in Slack")
     event = body["event"]
     if "channel_type" in event and event["channel_type"] == "channel":
-        response = await send_to_chainlit(event["text"])
-        await say(response)
+        with span("slack.event", event_type="message"):
+            if is_duplicate(body):
+                return
+            await enqueue_forward(event["text"], say)
+
+async def enqueue_forward(message, say):
+    """Queue a message for Chainlit, or tell the user we're overloaded."""
+    try:
+        # Workers run in their own tasks, so carry the trace context in the job
+        forward_queue.put_nowait((message, say, current_traceparent(), time.monotonic()))
+    except asyncio.QueueFull:
+        logger.warning(f"Forward queue full ({CHAINLIT_QUEUE_SIZE}), rejecting message")
+        await say(OVERLOAD_MESSAGE)
 
-async def send_to_chainlit(message):
-    async with aiohttp.ClientSession() as session:
-        async with session.post('http://localhost:8000/slack_message', json={'message': message}) as resp:
-            return await resp.text()
+async def forward_worker(worker_id):
+    while True:
+        message, say, traceparent, enqueued_at = await forward_queue.get()
+        try:
+            queue_wait_ms = round((time.monotonic() - enqueued_at) * 1000, 1)
+            with span("slack.forward", parent=traceparent, worker=worker_id, queue_wait_ms=queue_wait_ms):
+                await stream_to_slack(message, say)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} failed to forward message: {e}")
+            try:
+                await say("Sorry, something went wrong while processing your message.")
+            except Exception as reply_error:
+                # Slack itself may be failing; the worker must survive either way
+                logger.error(f"Worker {worker_id} failed to send error reply: {reply_error}")
+        finally:
+            forward_queue.task_done()
+
+async def stream_to_slack(message, say):
+    """Post a placeholder, then edit it as Chainlit streams the answer back."""
+    with span("slack.post_placeholder"):
+        placeholder = await say(PLACEHOLDER_MESSAGE)
+    channel, ts = placeholder["channel"], placeholder["ts"]
+    text = ""
+    shown = None
+    last_update = 0.0
+    updates = 0
+    with span("chainlit.stream") as attrs:
+        started = time.monotonic()
+        async for chunk in stream_from_chainlit(message):
+            if not text:
+                attrs["time_to_first_chunk_ms"] = round((time.monotonic() - started) * 1000, 1)
+            text += chunk
+            now = time.monotonic()
+            if now - last_update >= SLACK_UPDATE_INTERVAL and update_limiter.try_acquire():
+                last_update = now
+                try:
+                    await slack_app.client.chat_update(channel=channel, ts=ts, text=text)
+                except SlackApiError as e:
+                    if not is_rate_limited(e):
+                        raise
+                    # A skipped progress update is fine; the final one catches up
+                    continue
+                shown = text
+                updates += 1
+        attrs["response_chars"] = len(text)
+        attrs["slack_updates"] = updates
+    if text != shown:
+        with span("slack.final_update"):
+            await final_update(channel, ts, text or "(empty response)")
+
+async def final_update(channel, ts, text):
+    for attempt in range(SLACK_FINAL_UPDATE_RETRIES + 1):
+        await update_limiter.acquire()
+        try:
+            await slack_app.client.chat_update(channel=channel, ts=ts, text=text)
+            return
+        except SlackApiError as e:
+            if not is_rate_limited(e) or attempt == SLACK_FINAL_UPDATE_RETRIES:
+                raise
+            headers = {k.lower(): str(v) for k, v in (e.response.headers or {}).items()}
+            retry_after = headers.get("retry-after", "1")
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 1.0)
+
+async def stream_from_chainlit(message):
+    headers = inject_headers()
+    async with chainlit_session.post(CHAINLIT_STREAM_URL, json={'message': message}, headers=headers) as resp:
+        resp.raise_for_status()
+        # Chunks can split multi-byte characters, so decode incrementally
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for chunk in resp.content.iter_any():
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
 
 # FastAPI routes
 @app.get("/")
 async def get():
     return {"message": "FastAPI with Slack integration is running"}
 
+@app.get("/stats")
+async def stats():
+    return {
+        "queued": forward_queue.qsize() if forward_queue else 0,
+        "queue_size": CHAINLIT_QUEUE_SIZE,
+        "max_inflight": CHAINLIT_MAX_INFLIGHT,
+        "dedup_entries": len(seen_events._seen),
+    }
+
 # Socket Mode handler
 async def start_socket_mode():
     handler = AsyncSocketModeHandler(slack_app, os.environ["SLACK_APP_TOKEN"])
@@ -50,9 +248,28 @@ async def start_socket_mode():
 # Background tasks
 @app.on_event("startup")
 async def startup_event():
+    global chainlit_session, forward_queue
+    # One pooled client for every forward; the connector caps open sockets
+    chainlit_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=CHAINLIT_MAX_INFLIGHT),
+        timeout=aiohttp.ClientTimeout(total=None, sock_read=CHAINLIT_TIMEOUT),
+    )
+    forward_queue = asyncio.Queue(maxsize=CHAINLIT_QUEUE_SIZE)
+    for i in range(CHAINLIT_MAX_INFLIGHT):
+        forward_workers.append(asyncio.create_task(forward_worker(i)))
+
     # Start Slack app in Socket Mode
     asyncio.create_task(start_socket_mode())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in forward_workers:
+        task.cancel()
+    await asyncio.gather(*forward_workers, return_exceptions=True)
+    forward_workers.clear()
+    if chainlit_session:
+        await chainlit_session.close()
+
 # Run the FastAPI app
 if __name__ == "__main__":
     import uvicorn
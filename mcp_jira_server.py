@@ -12,6 +12,8 @@ import requests
 from requests.auth import HTTPBasicAuth
 import logging
 
+from tracing import span
+
 # MCP SDK imports (you'll need to install mcp package)
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
@@ -41,9 +43,12 @@ class JiraClient:
         """Make authenticated request to Jira API"""
         url = f"{self.base_url}/rest/api/3/{endpoint}"
         try:
-            response = requests.get(url, auth=self.auth, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+            with span("jira.http", endpoint=endpoint) as attrs:
+                response = requests.get(url, auth=self.auth, headers=self.headers, params=params)
+                attrs["status_code"] = response.status_code
+                response.raise_for_status()
+            with span("jira.parse_response", bytes=len(response.content)):
+                return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Jira API request failed: {e}")
             raise
@@ -178,9 +183,27 @@ async def handle_list_tools() -> List[Tool]:
         )
     ]
 
+def json_result(data: Any) -> List[TextContent]:
+    """Serialize a Jira response as the tool's text content"""
+    with span("mcp.serialize") as attrs:
+        text = json.dumps(data, indent=2)
+        attrs["chars"] = len(text)
+    return [TextContent(type="text", text=text)]
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     """Handle tool calls"""
+    # Clients may pass their W3C traceparent as `_traceparent` so these spans
+    # join their trace. Nothing in this repo calls this server yet; an MCP
+    # client talking to it over stdio has to add the argument itself (for
+    # example via mcp_query.with_trace_context with MCP_PROPAGATE_TRACE=1).
+    arguments = dict(arguments or {})
+    traceparent = arguments.pop("_traceparent", None)
+    with span("mcp.call_tool", parent=traceparent, tool=name):
+        return _call_tool(name, arguments)
+
+def _call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """Dispatch a tool call to the Jira client"""
     if not jira_client:
         return [TextContent(
             type="text",
@@ -190,44 +213,29 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
     try:
         if name == "get_projects":
             projects = jira_client.get_projects()
-            return [TextContent(
-                type="text",
-                text=json.dumps(projects, indent=2)
-            )]
+            return json_result(projects)
         
         elif name == "get_project_details":
             project_key = arguments.get("project_key")
             project = jira_client.get_project_details(project_key)
-            return [TextContent(
-                type="text",
-                text=json.dumps(project, indent=2)
-            )]
+            return json_result(project)
         
         elif name == "get_epics":
             project_key = arguments.get("project_key")
             epics = jira_client.get_epics(project_key)
-            return [TextContent(
-                type="text",
-                text=json.dumps(epics, indent=2)
-            )]
+            return json_result(epics)
         
         elif name == "get_user_stories":
             project_key = arguments.get("project_key")
             epic_key = arguments.get("epic_key")
             stories = jira_client.get_user_stories(project_key, epic_key)
-            return [TextContent(
-                type="text",
-                text=json.dumps(stories, indent=2)
-            )]
+            return json_result(stories)
         
         elif name == "search_issues":
             jql = arguments.get("jql")
             max_results = arguments.get("max_results", 50)
             results = jira_client.search_issues(jql, max_results=max_results)
-            return [TextContent(
-                type="text",
-                text=json.dumps(results, indent=2)
-            )]
+            return json_result(results)
         
         else:
             return [TextContent(
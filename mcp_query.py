@@ -1,8 +1,13 @@
+import argparse
 import asyncio
 import json
 import os
+import sys
+import time
 from mcp_use import MCPClient
 
+from tracing import current_traceparent, span
+
 # --- Configuration ---
 # Assuming your mcp-atlassian server is running locally on port 8080
 MCP_SERVER_HOST = "localhost"
@@ -13,6 +18,25 @@ MCP_SERVICE_NAME = "atlassian" # This is the default service name for mcp-atlass
 # It's usually /mcp/<service_name>/sse
 MCP_SERVER_SSE_PATH = f"/mcp/{MCP_SERVICE_NAME}/sse"
 
+# Batch mode defaults
+DEFAULT_CONCURRENCY = 10
+
+# Only servers that understand a `_traceparent` tool argument (our stdio
+# mcp_jira_server.py does; mcp-atlassian does not) should receive one, so
+# propagation is a separate opt-in from TRACING_ENABLED.
+MCP_PROPAGATE_TRACE = os.getenv("MCP_PROPAGATE_TRACE", "0") == "1"
+
+def with_trace_context(params):
+    """
+    Adds the active span's traceparent as a `_traceparent` argument when
+    MCP_PROPAGATE_TRACE=1 and tracing is enabled; otherwise returns `params`
+    unchanged. The spans recorded here are local either way.
+    """
+    traceparent = current_traceparent()
+    if not MCP_PROPAGATE_TRACE or not traceparent:
+        return params
+    return {**params, "_traceparent": traceparent}
+
 async def query_mcp_jira():
     """
     Connects to the MCP Atlassian server and queries a Jira ticket.
@@ -32,10 +56,11 @@ async def query_mcp_jira():
         }
 
         print(f"Requesting tool: {tool_name} with params: {params}")
-        response = await client.invoke_tool(
-            tool_name=tool_name,
-            params=params
-        )
+        with span("mcp.invoke_tool", tool=tool_name):
+            response = await client.invoke_tool(
+                tool_name=tool_name,
+                params=with_trace_context(params)
+            )
 
         print("\n--- Response from jira_get_issue ---")
         # MCP responses are typically JSON. Parse it for better readability.
@@ -54,10 +79,11 @@ async def query_mcp_jira():
         }
 
         print(f"Requesting tool: {tool_name} with params: {params}")
-        response = await client.invoke_tool(
-            tool_name=tool_name,
-            params=params
-        )
+        with span("mcp.invoke_tool", tool=tool_name):
+            response = await client.invoke_tool(
+                tool_name=tool_name,
+                params=with_trace_context(params)
+            )
 
         print("\n--- Response from confluence_search ---")
         try:
@@ -74,7 +100,100 @@ async def query_mcp_jira():
         await client.disconnect()
         print("\nDisconnected from MCP server.")
 
+def load_tool_calls(path):
+    """
+    Reads tool calls from a JSON Lines file, one call per line:
+        {"tool": "jira_get_issue", "params": {"issue_key": "PROJ-123"}}
+    An optional "id" is echoed back in the results; it defaults to the line number.
+    """
+    calls = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            call = json.loads(line)
+            calls.append({
+                "id": call.get("id", line_no),
+                "tool": call["tool"],
+                "params": call.get("params", {}),
+            })
+    return calls
+
+async def run_tool_call(client, call, semaphore):
+    """Invokes one tool call under the concurrency limit and returns its result record."""
+    async with semaphore:
+        started = time.time()
+        t0 = time.perf_counter()
+        record = {"id": call["id"], "tool": call["tool"], "params": call["params"], "started_at": started}
+        try:
+            with span("mcp.invoke_tool", tool=call["tool"]):
+                response = await client.invoke_tool(tool_name=call["tool"], params=with_trace_context(call["params"]))
+            try:
+                record["response"] = json.loads(response)
+            except (TypeError, json.JSONDecodeError):
+                record["response"] = response
+            record["ok"] = True
+        except Exception as e:
+            record["ok"] = False
+            record["error"] = str(e)
+        record["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return record
+
+async def run_batch(input_path, output_path, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Runs every tool call in `input_path` over a single MCP connection, at most
+    `concurrency` at a time, writing one JSON line per call as it completes.
+    """
+    calls = load_tool_calls(input_path)
+    client = MCPClient(host=MCP_SERVER_HOST, port=MCP_SERVER_PORT)
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+    t0 = time.perf_counter()
+
+    try:
+        await client.connect()
+        print(f"Connected to MCP server, running {len(calls)} tool calls with concurrency {concurrency}", file=sys.stderr)
+
+        out = open(output_path, "w") if output_path != "-" else sys.stdout
+        try:
+            tasks = [asyncio.create_task(run_tool_call(client, call, semaphore)) for call in calls]
+            for done in asyncio.as_completed(tasks):
+                record = await done
+                if not record["ok"]:
+                    failed += 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    except ConnectionRefusedError:
+        print(f"Error: Connection refused. Is the MCP server running at {MCP_SERVER_HOST}:{MCP_SERVER_PORT}?", file=sys.stderr)
+        return 1
+    finally:
+        await client.disconnect()
+
+    elapsed = time.perf_counter() - t0
+    print(f"Completed {len(calls)} calls ({failed} failed) in {elapsed:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query Jira/Confluence through the MCP Atlassian server")
+    parser.add_argument("--batch", metavar="FILE", help="JSON Lines file of tool calls to run concurrently")
+    parser.add_argument("--output", default="-", help="JSON Lines output file for batch results (default: stdout)")
+    parser.add_argument("--concurrency", type=positive_int, default=DEFAULT_CONCURRENCY, help="Max in-flight tool calls in batch mode")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.batch:
+        sys.exit(asyncio.run(run_batch(args.batch, args.output, args.concurrency)))
     # Make sure to replace "YOUR_JIRA_TICKET_KEY" in the script
     # and ensure your mcp-atlassian server is running and configured correctly.
     asyncio.run(query_mcp_jira())
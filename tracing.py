@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Lightweight request tracing for the Slack -> FastAPI -> Chainlit -> MCP -> Jira path.
+
+Tracing is off unless TRACING_ENABLED=1. When enabled, spans are appended as
+JSON Lines to TRACE_FILE (default traces.jsonl in the working directory) using
+OTLP span field names. Once the file exceeds TRACE_FILE_MAX_BYTES it is rotated
+to TRACE_FILE + ".1", replacing the previous backup. Spans are also POSTed to an
+OTLP/HTTP collector when OTEL_EXPORTER_OTLP_ENDPOINT is set; set TRACE_FILE to
+an empty string to export only there. Trace context crosses process boundaries
+as a W3C `traceparent` string.
+
+Print per-stage latency breakdowns with:
+    python tracing.py report traces.jsonl
+    python tracing.py report traces.jsonl --trace-id <trace id>
+"""
+
+import argparse
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", os.path.basename(sys.argv[0]) or "python")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")  # e.g. http://localhost:4318
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0") == "1"
+
+# (trace_id, span_id) of the active span in this thread/task
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class _Exporter:
+    """Writes finished spans from a background thread so callers never block on I/O."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def export(self, span: Dict):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass  # Dropping spans beats slowing the request path down
+
+    def flush(self, timeout: float = 2.0):
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.warning(f"Failed to export {len(batch)} spans: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        if TRACE_FILE:
+            self._rotate_if_full()
+            with open(TRACE_FILE, "a") as f:
+                for span in batch:
+                    f.write(json.dumps(span) + "\n")
+        if OTLP_ENDPOINT:
+            self._post_otlp(batch)
+
+    def _rotate_if_full(self):
+        try:
+            if os.path.getsize(TRACE_FILE) >= TRACE_FILE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+        except FileNotFoundError:
+            pass
+
+    def _post_otlp(self, batch):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "tracing"},
+                    "spans": [
+                        {**span, "attributes": [_otlp_attr(k, v) for k, v in span["attributes"].items()]}
+                        for span in batch
+                    ],
+                }],
+            }]
+        }
+        request = urllib.request.Request(
+            OTLP_ENDPOINT.rstrip("/") + "/v1/traces",
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+
+def _otlp_attr(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_exporter = None
+
+
+def _get_exporter():
+    global _exporter
+    if _exporter is None:
+        _exporter = _Exporter()
+    return _exporter
+
+
+def parse_traceparent(traceparent: Optional[str]):
+    """Returns (trace_id, span_id) from a W3C traceparent, or None if it is missing/invalid."""
+    if not traceparent:
+        return None
+    parts = traceparent.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current_traceparent() -> Optional[str]:
+    """The active span as a traceparent string, for outgoing requests."""
+    ctx = _current.get()
+    if ctx is None:
+        return None
+    return f"00-{ctx[0]}-{ctx[1]}-01"
+
+
+def inject_headers(headers: Optional[Dict] = None) -> Dict:
+    """Adds the traceparent header for the active span to `headers`."""
+    headers = dict(headers or {})
+    traceparent = current_traceparent()
+    if traceparent:
+        headers["traceparent"] = traceparent
+    return headers
+
+
+@contextmanager
+def span(name: str, parent: Optional[str] = None, **attributes):
+    """
+    Times the enclosed block as a span named `name`.
+
+    The parent is the active span, or `parent` (a traceparent string) when the
+    context arrived from another process. Yields the span's attribute dict so
+    callers can add attributes while it runs.
+    """
+    if not TRACING_ENABLED:
+        yield attributes
+        return
+
+    remote = parse_traceparent(parent)
+    previous = _current.get()
+    parent_ctx = remote or previous
+    trace_id = parent_ctx[0] if parent_ctx else secrets.token_hex(16)
+    span_id = secrets.token_hex(8)
+    _current.set((trace_id, span_id))
+
+    start_ns = time.time_ns()
+    status = {"code": "STATUS_CODE_OK"}
+    try:
+        yield attributes
+    except BaseException as e:
+        status = {"code": "STATUS_CODE_ERROR", "message": str(e)}
+        raise
+    finally:
+        end_ns = time.time_ns()
+        # Restore by value rather than token: spans may end in a different
+        # context than they started in (e.g. around async generator yields)
+        _current.set(previous)
+        _get_exporter().export({
+            "traceId": trace_id,
+            "spanId": span_id,
+            "parentSpanId": parent_ctx[1] if parent_ctx else "",
+            "name": name,
+            "service": SERVICE_NAME,
+            "startTimeUnixNano": start_ns,
+            "endTimeUnixNano": end_ns,
+            "attributes": attributes,
+            "status": status,
+        })
+
+
+# --- Reporting CLI ---
+
+def load_spans(path):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def _duration_ms(s):
+    return (s["endTimeUnixNano"] - s["startTimeUnixNano"]) / 1e6
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def print_stage_summary(spans):
+    by_name = {}
+    for s in spans:
+        by_name.setdefault((s.get("service", ""), s["name"]), []).append(_duration_ms(s))
+    print(f"{'service':<24} {'stage':<32} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for (service, name), durations in sorted(by_name.items(), key=lambda kv: -sum(kv[1])):
+        print(f"{service:<24} {name:<32} {len(durations):>6} "
+              f"{_percentile(durations, 50):>10.1f} {_percentile(durations, 95):>10.1f} {max(durations):>10.1f}")
+
+
+def print_trace(spans, trace_id):
+    spans = [s for s in spans if s["traceId"] == trace_id]
+    if not spans:
+        print(f"No spans found for trace {trace_id}")
+        return
+    children = {}
+    for s in spans:
+        children.setdefault(s["parentSpanId"], []).append(s)
+    span_ids = {s["spanId"] for s in spans}
+    roots = [s for s in spans if s["parentSpanId"] not in span_ids]
+    trace_start = min(s["startTimeUnixNano"] for s in spans)
+
+    def walk(s, depth):
+        offset = (s["startTimeUnixNano"] - trace_start) / 1e6
+        print(f"{offset:>9.1f} ms  {_duration_ms(s):>9.1f} ms  {'  ' * depth}{s['name']} [{s.get('service', '')}]")
+        for child in sorted(children.get(s["spanId"], []), key=lambda c: c["startTimeUnixNano"]):
+            walk(child, depth + 1)
+
+    print(f"Trace {trace_id}")
+    print(f"{'start':>12}  {'duration':>12}  span")
+    for root in sorted(roots, key=lambda r: r["startTimeUnixNano"]):
+        walk(root, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency breakdowns from trace files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="Summarize span latencies")
+    report.add_argument("files", nargs="+", help="JSON Lines span files (one per service is fine)")
+    report.add_argument("--trace-id", help="Print the span tree of a single trace")
+    args = parser.parse_args()
+
+    spans = []
+    for path in args.files:
+        spans.extend(load_spans(path))
+    if args.trace_id:
+        print_trace(spans, args.trace_id)
+    else:
+        print_stage_summary(spans)
+
+
+if __name__ == "__main__":
+    main()